@@ -26,7 +26,13 @@
 
 import pytest
 from botocore.exceptions import ClientError
-from util import random_string, full_scan, full_query, multiset
+from util import random_string, full_scan, full_scan_iter, full_query, full_query_iter, multiset
+
+# project() returns what we expect to get when fetching the given item with
+# a ProjectionExpression listing the top-level attributes in "wanted": only
+# the wanted attributes which the item actually has.
+def project(item, wanted):
+    return {k: item[k] for k in wanted if k in item}
 
 # Basic test for ProjectionExpression, requesting only top-level attributes.
 # Result should include the selected attributes only - if one wants the key
@@ -44,71 +50,125 @@ def test_projection_expression_toplevel(test_table):
                     ['nonexistent']    # Our item doesn't have this
                    ]:
         got_item = test_table.get_item(Key={'p': p, 'c': c}, ProjectionExpression=",".join(wanted), ConsistentRead=True)['Item']
-        expected_item = {k: item[k] for k in wanted if k in item}
+        expected_item = project(item, wanted)
         assert expected_item == got_item
 
 # Various simple tests for ProjectionExpression's syntax, using only top-evel
-# attributes.
-def test_projection_expression_toplevel_syntax(test_table_s):
+# attributes. All these tests read the same item, so it is written only once,
+# by the module-scoped projection_syntax_item fixture, which returns its key.
+@pytest.fixture(scope="module")
+def projection_syntax_item(test_table_s):
     p = random_string()
-    test_table_s.put_item(Item={'p': p, 'a': 'hello', 'b': 'hi'})
-    assert test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='a')['Item'] == {'a': 'hello'}
-    assert test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='#name', ExpressionAttributeNames={'#name': 'a'})['Item'] == {'a': 'hello'}
-    assert test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='a,b')['Item'] == {'a': 'hello', 'b': 'hi'}
-    assert test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression=' a  ,   b  ')['Item'] == {'a': 'hello', 'b': 'hi'}
+    test_table_s.put_item(Item={'p': p, 'a': 'hello', 'b': 'hi',
+        'l'*16: 'sixteen', 'l'*17: 'seventeen', 'l'*18: 'eighteen'})
+    return p
+
+@pytest.mark.parametrize('expression,names,expected', [
+    ('a', None, {'a': 'hello'}),
+    ('#name', {'#name': 'a'}, {'a': 'hello'}),
+    ('a,b', None, {'a': 'hello', 'b': 'hi'}),
+    (' a  ,   b  ', None, {'a': 'hello', 'b': 'hi'}),
+    # Long attribute names, which Alternator's parser may scan in chunks of
+    # 16 bytes: a long reference, a name ending exactly at the end of the
+    # first 16-byte chunk after its first character, one ending just after
+    # it, and one ending inside it, followed by more of the expression.
+    ('#' + 'x'*40, {'#' + 'x'*40: 'a'}, {'a': 'hello'}),
+    ('l'*17, None, {'l'*17: 'seventeen'}),
+    ('l'*18, None, {'l'*18: 'eighteen'}),
+    ('l'*16 + ',b', None, {'l'*16: 'sixteen', 'b': 'hi'}),
+    # Long runs of spaces, which Alternator's parser may skip 8 bytes at a
+    # time, before, between and after paths - and runs of spaces followed
+    # by other whitespace characters:
+    (' '*8 + 'a' + ' '*9 + ',' + ' '*17 + 'b' + ' '*20, None, {'a': 'hello', 'b': 'hi'}),
+    (' '*9 + 'a', None, {'a': 'hello'}),
+    ('a' + ' '*8, None, {'a': 'hello'}),
+    (' '*10 + '\t\n a', None, {'a': 'hello'}),
+    ('a' + ' '*10 + '\n\t,b', None, {'a': 'hello', 'b': 'hi'}),
+    (' '*16 + '\t' + ' '*9 + 'a' + ' '*8 + '\n', None, {'a': 'hello'}),
+    # Tabs and newlines are whitespace too:
+    ('a\t,\nb', None, {'a': 'hello', 'b': 'hi'}),
+    # Reserved words cannot be used as attribute names (see the error cases
+    # below), but can be referred to through ExpressionAttributeNames:
+    ('#in', {'#in': 'a'}, {'a': 'hello'}),
+    ('#SET', {'#SET': 'a'}, {'a': 'hello'}),
+    ('a,#between', {'#between': 'b'}, {'a': 'hello', 'b': 'hi'}),
+])
+def test_projection_expression_toplevel_syntax(test_table_s, projection_syntax_item, expression, names, expected):
+    kwargs = {'ExpressionAttributeNames': names} if names else {}
+    assert test_table_s.get_item(Key={'p': projection_syntax_item}, ConsistentRead=True, ProjectionExpression=expression, **kwargs)['Item'] == expected
+
+@pytest.mark.parametrize('expression,names', [
     # Missing or unused names in ExpressionAttributeNames are errors:
-    with pytest.raises(ClientError, match='ValidationException'):
-        test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='#name', ExpressionAttributeNames={'#wrong': 'a'})['Item'] == {'a': 'hello'}
-    with pytest.raises(ClientError, match='ValidationException'):
-        test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='#name', ExpressionAttributeNames={'#name': 'a', '#unused': 'b'})['Item'] == {'a': 'hello'}
+    ('#name', {'#wrong': 'a'}),
+    ('#name', {'#name': 'a', '#unused': 'b'}),
     # It is not allowed to fetch the same top-level attribute twice (or in
     # general, list two overlapping attributes). We get an error like
     # "Invalid ProjectionExpression: Two document paths overlap with each
     # other; must remove or rewrite one of these paths; path one: [a], path
     # two: [a]".
-    with pytest.raises(ClientError, match='ValidationException'):
-        test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='a,a')['Item']
+    ('a,a', None),
     # A comma with nothing after it is a syntax error:
-    with pytest.raises(ClientError, match='ValidationException'):
-        test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='a,')['Item']
-    with pytest.raises(ClientError, match='ValidationException'):
-        test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression=',a')['Item']
-    with pytest.raises(ClientError, match='ValidationException'):
-        test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='a,,b')['Item']
+    ('a,', None),
+    (',a', None),
+    ('a,,b', None),
     # An empty ProjectionExpression is not allowed. DynamoDB recognizes its
     # syntax, but then writes: "Invalid ProjectionExpression: The expression
     # can not be empty".
+    ('', None),
+    # A character which isn't allowed in a name, inside the first 16 bytes
+    # of a long name:
+    ('l'*5 + ';' + 'l'*20, None),
+    # Reserved words, in any case, cannot be used as attribute names:
+    ('in', None),
+    ('SET', None),
+    ('a,between', None),
+    # A "#" must be followed by a name, and two paths must be separated by
+    # a comma:
+    ('#', None),
+    ('a b', None),
+])
+def test_projection_expression_toplevel_syntax_error(test_table_s, projection_syntax_item, expression, names):
+    kwargs = {'ExpressionAttributeNames': names} if names else {}
     with pytest.raises(ClientError, match='ValidationException'):
-        test_table_s.get_item(Key={'p': p}, ConsistentRead=True, ProjectionExpression='')['Item']
+        test_table_s.get_item(Key={'p': projection_syntax_item}, ConsistentRead=True, ProjectionExpression=expression, **kwargs)
 
 # The following two tests are similar to test_projection_expression_toplevel()
 # which tested the GetItem operation - but these test Scan and Query.
 # Both test ProjectionExpression with only top-level attributes.
-def test_projection_expression_scan(filled_test_table):
+@pytest.mark.parametrize('wanted', [
+        ['another'],       # only non-key attributes (one item doesn't have it!)
+        ['c', 'another'],  # a key attribute (sort key) and non-key
+        ['p', 'c'],        # entire key
+        ['nonexistent']    # none of the items have this attribute!
+    ], ids=['nonkey', 'key_and_nonkey', 'fullkey', 'missing'])
+def test_projection_expression_scan(filled_test_table, wanted):
     table, items = filled_test_table
-    for wanted in [ ['another'],       # only non-key attributes (one item doesn't have it!)
-                    ['c', 'another'],  # a key attribute (sort key) and non-key
-                    ['p', 'c'],        # entire key
-                    ['nonexistent']    # none of the items have this attribute!
-                   ]:
-        got_items = full_scan(table,  ProjectionExpression=",".join(wanted))
-        expected_items = [{k: x[k] for k in wanted if k in x} for x in items]
-        assert multiset(expected_items) == multiset(got_items)
+    got_items = full_scan_iter(table,  ProjectionExpression=",".join(wanted))
+    expected_items = [project(x, wanted) for x in items]
+    assert multiset(expected_items) == multiset(got_items)
 
-def test_projection_expression_query(test_table):
+# The items read by test_projection_expression_query are written only once,
+# by this module-scoped fixture, and shared by all its parametrizations.
+@pytest.fixture(scope="module")
+def projection_query_items(test_table):
     p = random_string()
     items = [{'p': p, 'c': str(i), 'a': str(i*10), 'b': str(i*100) } for i in range(10)]
     with test_table.batch_writer() as batch:
         for item in items:
             batch.put_item(item)
-    for wanted in [ ['a'],             # only non-key attributes
-                    ['c', 'a'],        # a key attribute (sort key) and non-key
-                    ['p', 'c'],        # entire key
-                    ['nonexistent']    # none of the items have this attribute!
-                   ]:
-        got_items = full_query(test_table, KeyConditions={'p': {'AttributeValueList': [p], 'ComparisonOperator': 'EQ'}}, ProjectionExpression=",".join(wanted))
-        expected_items = [{k: x[k] for k in wanted if k in x} for x in items]
-        assert multiset(expected_items) == multiset(got_items)
+    return p, items
+
+@pytest.mark.parametrize('wanted', [
+        ['a'],             # only non-key attributes
+        ['c', 'a'],        # a key attribute (sort key) and non-key
+        ['p', 'c'],        # entire key
+        ['nonexistent']    # none of the items have this attribute!
+    ], ids=['nonkey', 'key_and_nonkey', 'fullkey', 'missing'])
+def test_projection_expression_query(test_table, projection_query_items, wanted):
+    p, items = projection_query_items
+    got_items = full_query_iter(test_table, KeyConditions={'p': {'AttributeValueList': [p], 'ComparisonOperator': 'EQ'}}, ProjectionExpression=",".join(wanted))
+    expected_items = [project(x, wanted) for x in items]
+    assert multiset(expected_items) == multiset(got_items)
 
 # The previous tests all fetched only top-level attributes. They could all
 # be written using AttributesToGet instead of ProjectionExpression (and,
@@ -23,21 +23,46 @@ import collections
 import time
 
 def random_string(length=10, chars=string.ascii_uppercase + string.digits):
-    return ''.join(random.choice(chars) for x in range(length))
+    return ''.join(random.choices(chars, k=length))
 
 def random_bytes(length=10):
     return bytearray(random.getrandbits(8) for _ in range(length))
 
+# _pages() calls a paginated table operation (table.scan or table.query)
+# with the given parameters, following LastEvaluatedKey from page to page,
+# and yields the list of items in each page.
+def _pages(operation, **kwargs):
+    response = operation(**kwargs)
+    yield response['Items']
+    last_key = response.get('LastEvaluatedKey')
+    while last_key is not None:
+        response = operation(ExclusiveStartKey=last_key, **kwargs)
+        yield response['Items']
+        last_key = response.get('LastEvaluatedKey')
+
+def _collect_pages(operation, **kwargs):
+    items = []
+    for page in _pages(operation, **kwargs):
+        items.extend(page)
+    return items
+
 # Utility functions for scan and query into an array of items:
 # TODO: add to full_scan and full_query by default ConsistentRead=True, as
 # it's not useful for tests without it!
 def full_scan(table, **kwargs):
-    response = table.scan(**kwargs)
-    items = response['Items']
-    while 'LastEvaluatedKey' in response:
-        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
-        items.extend(response['Items'])
-    return items
+    return _collect_pages(table.scan, **kwargs)
+
+# full_scan_iter and full_query_iter are like full_scan and full_query, but
+# return a generator which yields the items page by page, instead of first
+# collecting all of them into one list. This is useful when the caller just
+# consumes the items once, e.g., passes them to multiset().
+def full_scan_iter(table, **kwargs):
+    for page in _pages(table.scan, **kwargs):
+        yield from page
+
+def full_query_iter(table, **kwargs):
+    for page in _pages(table.query, **kwargs):
+        yield from page
 
 # full_scan_and_count returns both items and count as returned by the server.
 # Note that count isn't simply len(items) - the server returns them
@@ -61,28 +86,32 @@ def full_scan_and_count(table, **kwargs):
 
 # Utility function for fetching the entire results of a query into an array of items
 def full_query(table, **kwargs):
-    response = table.query(**kwargs)
-    items = response['Items']
-    while 'LastEvaluatedKey' in response:
-        response = table.query(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
-        items.extend(response['Items'])
-    return items
+    return _collect_pages(table.query, **kwargs)
 
 # To compare two lists of items (each is a dict) without regard for order,
 # "==" is not good enough because it will fail if the order is different.
 # The following function, multiset() converts the list into a multiset
 # (set with duplicates) where order doesn't matter, so the multisets can
 # be compared.
+# A dict is frozen into a frozenset of its (key, value) pairs, and a list into
+# a tuple, so a frozen map can never be mistaken for a frozen list.
 
 def freeze(item):
     if isinstance(item, dict):
-        return frozenset((key, freeze(value)) for key, value in item.items())
+        # Most items only hold scalar (hashable) values, and for them the
+        # frozenset of their items is already frozen. Only when building it
+        # fails, because of a nested dict or list, do we need to freeze each
+        # value recursively.
+        try:
+            return frozenset(item.items())
+        except TypeError:
+            return frozenset((key, freeze(value)) for key, value in item.items())
     elif isinstance(item, list):
         return tuple(freeze(value) for value in item)
     return item
 
 def multiset(items):
-    return collections.Counter([freeze(item) for item in items])
+    return collections.Counter(freeze(item) for item in items)
 
 # NOTE: alternator_Test prefix contains a capital letter on purpose,
 #in order to validate case sensitivity in alternator
@@ -2430,40 +2430,73 @@ future<executor::request_return_type> executor::batch_get_item(client_state& cli
 
 class describe_items_visitor {
     typedef std::vector<const column_definition*> columns_t;
-    const columns_t& _columns;
+    // Everything we need to know about a selected column to output its
+    // cells. It doesn't change from row to row, so it is computed once per
+    // page instead of once per cell.
+    struct column_info {
+        const column_definition* cdef;
+        std::string name;
+        std::string type;
+        bool is_attrs;
+        // Whether the projection wants this column. The attrs column is
+        // wanted unless no attribute can come from it, and its attributes
+        // are then filtered one by one.
+        bool wanted;
+    };
+    std::vector<column_info> _column_infos;
     const std::unordered_set<std::string>& _attrs_to_get;
-    typename columns_t::const_iterator _column_it;
+    std::vector<column_info>::const_iterator _column_it;
     rjson::value _item;
     rjson::value _items;
 
 public:
     describe_items_visitor(const columns_t& columns, const std::unordered_set<std::string>& attrs_to_get)
-            : _columns(columns)
-            , _attrs_to_get(attrs_to_get)
-            , _column_it(columns.begin())
+            : _attrs_to_get(attrs_to_get)
             , _item(rjson::empty_object())
             , _items(rjson::empty_array())
-    { }
+    {
+        _column_infos.reserve(columns.size());
+        size_t wanted_columns = 0;
+        for (const column_definition* cdef : columns) {
+            std::string name = cdef->name_as_text();
+            bool is_attrs = name == executor::ATTRS_COLUMN_NAME;
+            bool wanted = is_attrs || attrs_to_get.empty() || attrs_to_get.count(name) > 0;
+            if (wanted && !is_attrs) {
+                ++wanted_columns;
+            }
+            std::string type = (wanted && !is_attrs) ? type_to_string(cdef->type) : std::string();
+            _column_infos.push_back(column_info{cdef, std::move(name), std::move(type), is_attrs, wanted});
+        }
+        // If every attribute the projection asks for is a real column (e.g.,
+        // only key attributes were requested), nothing will be taken from the
+        // attrs column, so we can avoid deserializing it in every row.
+        if (!attrs_to_get.empty() && wanted_columns == attrs_to_get.size()) {
+            for (column_info& column : _column_infos) {
+                if (column.is_attrs) {
+                    column.wanted = false;
+                }
+            }
+        }
+        _column_it = _column_infos.cbegin();
+    }
 
     void start_row() {
-        _column_it = _columns.begin();
+        _column_it = _column_infos.cbegin();
     }
 
     void accept_value(const std::optional<query::result_bytes_view>& result_bytes_view) {
-        if (!result_bytes_view) {
+        if (!result_bytes_view || !_column_it->wanted) {
             ++_column_it;
             return;
         }
         result_bytes_view->with_linearized([this] (bytes_view bv) {
-            std::string column_name = (*_column_it)->name_as_text();
-            if (column_name != executor::ATTRS_COLUMN_NAME) {
-                if (_attrs_to_get.empty() || _attrs_to_get.count(column_name) > 0) {
-                    if (!_item.HasMember(column_name.c_str())) {
-                        rjson::set_with_string_name(_item, column_name, rjson::empty_object());
-                    }
-                    rjson::value& field = _item[column_name.c_str()];
-                    rjson::set_with_string_name(field, type_to_string((*_column_it)->type), json_key_column_value(bv, **_column_it));
+            const column_info& column = *_column_it;
+            if (!column.is_attrs) {
+                if (!_item.HasMember(column.name.c_str())) {
+                    rjson::set_with_string_name(_item, column.name, rjson::empty_object());
                 }
+                rjson::value& field = _item[column.name.c_str()];
+                rjson::set_with_string_name(field, column.type, json_key_column_value(bv, *column.cdef));
             } else {
                 auto deserialized = attrs_type()->deserialize(bv, cql_serialization_format::latest());
                 auto keys_and_values = value_cast<map_type_impl::native_type>(deserialized);
@@ -25,10 +25,21 @@
 
 #include <seastarx.hh>
 
+#include <seastar/core/byteorder.hh>
 #include <seastar/core/print.hh>
 #include <seastar/util/log.hh>
 
+#include <algorithm>
+#include <array>
 #include <functional>
+#include <limits>
+#include <list>
+#include <string_view>
+#include <unordered_map>
+
+#ifdef __SSE4_2__
+#include <nmmintrin.h>
+#endif
 
 namespace alternator {
 
@@ -56,13 +67,256 @@ parse_update_expression(std::string query) {
     }
 }
 
+// ProjectionExpression's syntax is tiny - a comma-separated list of
+// attribute paths - so instead of going through the ANTLR-generated parser,
+// with its per-token allocations and heavy state machine, we parse it with
+// the following hand-written recursive-descent parser. It must accept exactly
+// the same language as the "path" rule in expressions.g, including skipping
+// whitespace between any two tokens, and rejecting the grammar's keywords
+// (which the ANTLR lexer never returns as a NAME).
+namespace {
+
+enum class char_class : uint8_t { other, space, alpha, digit, underscore };
+
+constexpr std::array<char_class, 256> make_char_classes() {
+    std::array<char_class, 256> ret{};
+    for (unsigned c = 0; c < 256; c++) {
+        if (c == ' ' || c == '\t' || c == '\n' || c == '\r') {
+            ret[c] = char_class::space;
+        } else if ((c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z')) {
+            ret[c] = char_class::alpha;
+        } else if (c >= '0' && c <= '9') {
+            ret[c] = char_class::digit;
+        } else if (c == '_') {
+            ret[c] = char_class::underscore;
+        } else {
+            ret[c] = char_class::other;
+        }
+    }
+    return ret;
+}
+
+constexpr std::array<char_class, 256> char_classes = make_char_classes();
+
+char_class classify(char c) {
+    return char_classes[static_cast<unsigned char>(c)];
+}
+
+bool is_alnum(char c) {
+    auto cls = classify(c);
+    return cls == char_class::alpha || cls == char_class::digit || cls == char_class::underscore;
+}
+
+// The keywords of expressions.g, which cannot be used as attribute names
+// (they can still be used via an ExpressionAttributeNames reference).
+bool is_keyword(std::string_view name) {
+    static constexpr std::string_view keywords[] = {
+        "set", "remove", "add", "delete", "and", "or", "not", "between", "in"
+    };
+    for (auto keyword : keywords) {
+        if (name.size() == keyword.size() && std::equal(name.begin(), name.end(), keyword.begin(),
+                [] (char a, char b) { return ::tolower(static_cast<unsigned char>(a)) == b; })) {
+            return true;
+        }
+    }
+    return false;
+}
+
+class projection_expression_parser {
+    std::string_view _input;
+    size_t _pos = 0;
+
+    [[noreturn]] void syntax_error() const {
+        throw expressions_syntax_error(format("syntax error at position {}", _pos));
+    }
+    bool at_end() const {
+        return _pos == _input.size();
+    }
+    void skip_whitespace() {
+        // Long runs of spaces (e.g., in a long, neatly-formatted list of
+        // attributes) are skipped 8 bytes at a time: XORing with a word of
+        // spaces leaves zero bytes exactly where the spaces were, so the
+        // lowest set bit tells us where the first non-space byte is.
+        // Anything else (including tabs and newlines) is left for the
+        // byte-by-byte loop below.
+        static constexpr uint64_t spaces = 0x2020202020202020ULL;
+        while (_input.size() - _pos >= sizeof(uint64_t)) {
+            uint64_t chunk = seastar::read_le<uint64_t>(_input.data() + _pos) ^ spaces;
+            if (chunk) {
+                _pos += __builtin_ctzll(chunk) / 8;
+                break;
+            }
+            _pos += sizeof(uint64_t);
+        }
+        while (!at_end() && classify(_input[_pos]) == char_class::space) {
+            ++_pos;
+        }
+    }
+    // Skip whitespace, and then consume the character c if it comes next.
+    bool consume(char c) {
+        skip_whitespace();
+        if (!at_end() && _input[_pos] == c) {
+            ++_pos;
+            return true;
+        }
+        return false;
+    }
+    // Skip a run of ALNUM characters, i.e., the rest of a NAME or NAMEREF.
+    void skip_alnum() {
+#ifdef __SSE4_2__
+        // With SSE4.2 (which our default target architecture has), a single
+        // PCMPESTRI instruction finds the first byte in a 16-byte chunk
+        // which is not in any of the ALNUM ranges, so long attribute names
+        // are scanned 16 bytes at a time. The tail is left to the loop below.
+        const __m128i alnum_ranges = _mm_setr_epi8('a', 'z', 'A', 'Z', '0', '9', '_', '_', 0, 0, 0, 0, 0, 0, 0, 0);
+        while (_input.size() - _pos >= 16) {
+            __m128i chunk = _mm_loadu_si128(reinterpret_cast<const __m128i*>(_input.data() + _pos));
+            int i = _mm_cmpestri(alnum_ranges, 8, chunk, 16,
+                    _SIDD_UBYTE_OPS | _SIDD_CMP_RANGES | _SIDD_NEGATIVE_POLARITY | _SIDD_LEAST_SIGNIFICANT);
+            _pos += i;
+            if (i < 16) {
+                return;
+            }
+        }
+#endif
+        while (!at_end() && is_alnum(_input[_pos])) {
+            ++_pos;
+        }
+    }
+    // path_component: NAME | NAMEREF
+    //   NAME: ALPHA ALNUM*
+    //   NAMEREF: '#' ALNUM+
+    std::string path_component() {
+        skip_whitespace();
+        size_t start = _pos;
+        if (at_end()) {
+            syntax_error();
+        }
+        if (_input[_pos] == '#') {
+            ++_pos;
+            if (at_end() || !is_alnum(_input[_pos])) {
+                syntax_error();
+            }
+        } else if (classify(_input[_pos]) != char_class::alpha) {
+            syntax_error();
+        }
+        skip_alnum();
+        std::string_view name = _input.substr(start, _pos - start);
+        if (is_keyword(name)) {
+            _pos = start;
+            syntax_error();
+        }
+        return std::string(name);
+    }
+    // INTEGER: DIGIT+, limited to what fits in an int (like std::stoi).
+    unsigned index() {
+        skip_whitespace();
+        if (at_end() || classify(_input[_pos]) != char_class::digit) {
+            syntax_error();
+        }
+        uint64_t ret = 0;
+        while (!at_end() && classify(_input[_pos]) == char_class::digit) {
+            ret = ret * 10 + (_input[_pos] - '0');
+            if (ret > uint64_t(std::numeric_limits<int>::max())) {
+                syntax_error();
+            }
+            ++_pos;
+        }
+        return ret;
+    }
+    // path: path_component ('.' path_component | '[' INTEGER ']')*
+    parsed::path path() {
+        parsed::path p;
+        p.set_root(path_component());
+        for (;;) {
+            if (consume('.')) {
+                p.add_dot(path_component());
+            } else if (consume('[')) {
+                p.add_index(index());
+                if (!consume(']')) {
+                    syntax_error();
+                }
+            } else {
+                return p;
+            }
+        }
+    }
+public:
+    explicit projection_expression_parser(std::string_view input) : _input(input) {}
+    // projection_expression: path (',' path)* EOF
+    std::vector<parsed::path> parse() {
+        std::vector<parsed::path> ret;
+        ret.push_back(path());
+        while (consume(',')) {
+            ret.push_back(path());
+        }
+        skip_whitespace();
+        if (!at_end()) {
+            syntax_error();
+        }
+        return ret;
+    }
+};
+
+} // anonymous namespace
+
+// Clients usually send the same few ProjectionExpression strings over and
+// over again (e.g., every page of a Scan repeats the same expression), and
+// parsing them is pure CPU work. So we keep a small LRU cache of parsed
+// projection expressions, keyed by the exact expression string. The parse
+// result does not depend on the schema or on any other request parameter
+// (ExpressionAttributeNames are resolved later, by the caller), so entries
+// never need to be invalidated - only evicted when the cache is full.
+// Like everything else in Seastar, the cache is per-shard, so it needs no
+// locking.
+class projection_expression_cache {
+    static constexpr size_t max_entries = 256;
+    // Expressions longer than DynamoDB's 4 KB limit on expression strings
+    // are not cached, so that a client sending huge expressions cannot pin
+    // more than max_entries * max_query_size bytes of memory on each shard.
+    static constexpr size_t max_query_size = 4096;
+    using entry = std::pair<std::string, std::vector<parsed::path>>;
+    // Most recently used entries are at the front of the list. The index's
+    // keys point into the list's strings, which never move.
+    std::list<entry> _lru;
+    std::unordered_map<std::string_view, std::list<entry>::iterator> _index;
+public:
+    const std::vector<parsed::path>* find(std::string_view query) {
+        auto it = _index.find(query);
+        if (it == _index.end()) {
+            return nullptr;
+        }
+        _lru.splice(_lru.begin(), _lru, it->second);
+        return &it->second->second;
+    }
+    void insert(std::string query, std::vector<parsed::path> paths) {
+        if (query.size() > max_query_size || _index.count(query)) {
+            return;
+        }
+        if (_lru.size() >= max_entries) {
+            _index.erase(_lru.back().first);
+            _lru.pop_back();
+        }
+        _lru.emplace_front(std::move(query), std::move(paths));
+        _index.emplace(_lru.front().first, _lru.begin());
+    }
+};
+
+static thread_local projection_expression_cache the_projection_expression_cache;
+
 std::vector<parsed::path>
 parse_projection_expression(std::string query) {
+    if (auto cached = the_projection_expression_cache.find(query)) {
+        return *cached;
+    }
+    std::vector<parsed::path> ret;
     try {
-        return do_with_parser(query,  std::mem_fn(&expressionsParser::projection_expression));
+        ret = projection_expression_parser(query).parse();
     } catch (...) {
         throw expressions_syntax_error(format("Failed parsing ProjectionExpression '{}': {}", query, std::current_exception()));
     }
+    the_projection_expression_cache.insert(std::move(query), ret);
+    return ret;
 }
 
 parsed::condition_expression
@@ -215,9 +215,10 @@ update_expression_clause returns [parsed::update_expression e]:
 update_expression returns [parsed::update_expression e]:
     (update_expression_clause { e.append($update_expression_clause.e); })* EOF;
 
-projection_expression returns [std::vector<parsed::path> v]:
-    p=path      { $v.push_back(std::move($p.p)); }
-    (',' p=path { $v.push_back(std::move($p.p)); } )* EOF;
+// Note that ProjectionExpression, a comma-separated list of paths, is not
+// parsed here: Because it is so simple (and so common), it is parsed by a
+// hand-written parser in expressions.cc, which must accept exactly the same
+// syntax for "path" as the "path" rule above.
 
 
 primitive_condition returns [parsed::primitive_condition c]: